@@ -1,3 +1,5 @@
+import json
+import os
 import random
 from collections import Counter
 from typing import Callable, List, Tuple
@@ -22,6 +24,10 @@ class Pieces(object):
     X_DIRECTION = [1, 1, -1, -1]  # Increment of x-coordinate in the direction of movement
     Y_DIRECTION = [1, -1, 1, -1]  # Increment of y-coordinate in the direction of movement
     INFINITE = inf  # infinite constant
+    NORMAL_WEIGHT = 1000  # Evaluation weight of a normal piece
+    KING_WEIGHT = 3000  # Evaluation weight of a king piece
+    EDGE_ROW_WEIGHT = 300  # Evaluation weight of a piece on its own edge row
+    WEIGHTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'weights.json')  # Tuned weights file
 
 
     def __init__(self, size=8):
@@ -217,14 +223,45 @@ class Pieces(object):
             self.board[x + dx // 2][y + dy // 2] = removed
 
 
-    # evaluate with heuristic method, it takes into account piece position and piece value (normal or king)
-    def evaluate_heuristic(self, maximizer: int):
+    @classmethod
+    def load_weights(cls, path: str = WEIGHTS_FILE):
         """
-    Evaluate the current state of the board using a heuristic approach.
+        Load the evaluation weights from a JSON file written by tune.py.
 
-    :param themax: WHITE or BLACK type themax player (int)
-    :return: board score (int)
-    """
+        :param path: Path of the weights file. Defaults to WEIGHTS_FILE.
+        :return: True if the weights were loaded, False if the file does not exist.
+        :raise ValueError: If the file is not a JSON object with numeric normal, king and edgeRow weights.
+        """
+        if not os.path.exists(path):
+            return False
+
+        with open(path) as f:
+            try:
+                weights = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ValueError(f'Invalid weights file {path}: {e}')
+
+        if not isinstance(weights, dict):
+            raise ValueError(f'Invalid weights file {path}: expected a JSON object')
+        for key in ('normal', 'king', 'edgeRow'):
+            # bool is a subclass of int but not a weight
+            if not isinstance(weights.get(key), (int, float)) or isinstance(weights[key], bool):
+                raise ValueError(f'Invalid weights file {path}: "{key}" must be a number')
+
+        cls.NORMAL_WEIGHT = weights['normal']
+        cls.KING_WEIGHT = weights['king']
+        cls.EDGE_ROW_WEIGHT = weights['edgeRow']
+        return True
+
+
+    def features(self, maximizer: int):
+        """
+        Count the board features used by the heuristic evaluation.
+
+        :param maximizer: WHITE or BLACK type maximizer player (int)
+        :return: (normals, kings, edgeRow) difference of normal pieces, difference of king pieces
+            and number of maximizer pieces on its edge row.
+        """
         normals = 0  # number of normal pieces
         kings = 0  # number of king pieces
         edgeRow = 0  # number of pieces on the edge row (aka king row), they're safe
@@ -241,7 +278,19 @@ class Pieces(object):
                     if sign == 1 and ((i == 0 and maximizer == self.WHITE) or (
                             i == self.size - 1 and maximizer == self.BLACK)):
                         edgeRow += 1
-        return normals * 1000 + kings * 3000 + edgeRow * 300
+        return normals, kings, edgeRow
+
+
+    # evaluate with heuristic method, it takes into account piece position and piece value (normal or king)
+    def evaluate_heuristic(self, maximizer: int):
+        """
+    Evaluate the current state of the board using a heuristic approach.
+
+    :param themax: WHITE or BLACK type themax player (int)
+    :return: board score (int)
+    """
+        normals, kings, edgeRow = self.features(maximizer)
+        return normals * self.NORMAL_WEIGHT + kings * self.KING_WEIGHT + edgeRow * self.EDGE_ROW_WEIGHT
 
 
     def stateValue(self, themax: int):
@@ -430,3 +479,8 @@ class Pieces(object):
         return (True, reset)
 
 
+# load tuned evaluation weights at startup if available, keep the default weights if the file is broken
+try:
+    Pieces.load_weights()
+except ValueError as e:
+    print(f'{e}, using the default weights')
@@ -0,0 +1,278 @@
+"""
+Perft: count the leaf nodes of the move tree to check and time the move generator.
+
+A ply is a whole turn: a capture sequence is a single move and each distinct
+capture path counts as a separate move.
+
+Usage:
+    python perft.py 8                          # perft from the start position
+    python perft.py 6 --divide                 # node count per root move
+    python perft.py 9 --cache --workers 8      # hashing cache and multiprocess splitting
+    python perft.py 5 --board ".w.w.w.w/w.w.w.w/.w.w.w.w/......../......../b.b.b.b./.b.b.b.b/b.b.b.b." --player white
+    python perft.py --verify                   # check the regression table
+"""
+import argparse
+import time
+from multiprocessing import Pool
+
+from chess import Pieces
+
+PIECE_CHARS = {'.': 0, 'w': Pieces.WHITE_NORMAL, 'W': Pieces.WHITE_KING,
+               'b': Pieces.BLACK_NORMAL, 'B': Pieces.BLACK_KING}  # Board string characters
+PLAYERS = {'white': Pieces.WHITE, 'black': Pieces.BLACK}
+
+# Position with kings, a double capture and a promotion move
+KINGS_BOARD = '......../..w...../...w.w../......../...w.B../..b...../.w....../B.......'
+
+# Known perft counts any board backend must match exactly: name -> (board, player, {depth: nodes})
+# The start position counts agree with the published English draughts perft values.
+REGRESSION = {
+    'start': (None, Pieces.BLACK, {
+        1: 7, 2: 49, 3: 302, 4: 1469, 5: 7361, 6: 36768, 7: 179740, 8: 845931,
+    }),
+    'start-white': (None, Pieces.WHITE, {
+        1: 7, 2: 49, 3: 302, 4: 1469, 5: 7361, 6: 36768,
+    }),
+    'kings': (KINGS_BOARD, Pieces.BLACK, {
+        1: 1, 2: 4, 3: 11, 4: 37, 5: 197, 6: 810, 7: 4209,
+    }),
+    'kings-white': (KINGS_BOARD, Pieces.WHITE, {
+        1: 7, 2: 12, 3: 48, 4: 160, 5: 668, 6: 2514, 7: 11323,
+    }),
+}
+
+
+def parse_board(text: str, boardClass=Pieces):
+    """
+    Build a game from a board string.
+
+    :param text: Rows separated by '/', top row first, with '.' for an empty square,
+        'w'/'W' for white normal/king and 'b'/'B' for black normal/king.
+    :param boardClass: Board backend, built with the board size. Defaults to Pieces.
+    :return: game with the given board.
+    """
+    rows = text.split('/')
+    game = boardClass(len(rows))
+    if any(len(row) != game.size for row in rows):
+        raise ValueError(f'Board must be {game.size}x{game.size}: {text}')
+    try:
+        game.board = [[PIECE_CHARS[c] for c in row] for row in rows]
+    except KeyError as e:
+        raise ValueError(f'Unknown piece character {e} in board: {text}')
+    return game
+
+
+def turns(game: Pieces, player: int):
+    """
+    Get the complete moves of a player, following every capture sequence to its end.
+
+    :param game: The game board.
+    :param player: The type of the player (WHITE, BLACK).
+    :return: list of moves, each a list of (x, y, nx, ny) steps.
+    """
+    paths = []
+
+    def follow(path, x, y, nx, ny):
+        canCapture, removed, promoted = game.playMove(x, y, nx, ny)
+        path = path + [(x, y, nx, ny)]
+        captures = game.nextPositions(nx, ny)[1] if canCapture else []
+        if len(captures) == 0:
+            paths.append(path)
+        for cx, cy in captures:
+            follow(path, nx, ny, cx, cy)
+        game.revokeMove(x, y, nx, ny, removed, promoted)
+
+    for position in game.nextMoves(player):
+        x, y = position[0]
+        for nx, ny in position[1]:
+            follow([], x, y, nx, ny)
+    return paths
+
+
+def play_turn(game: Pieces, path):
+    """
+    Play a complete move.
+
+    :param game: The game board.
+    :param path: The (x, y, nx, ny) steps of the move.
+    :return: the (removed, promoted) results of each step, to revoke the move.
+    """
+    return [game.playMove(x, y, nx, ny)[1:] for x, y, nx, ny in path]
+
+
+def revoke_turn(game: Pieces, path, undo):
+    """
+    Revoke a complete move played with play_turn.
+
+    :param game: The game board.
+    :param path: The (x, y, nx, ny) steps of the move.
+    :param undo: The value returned by play_turn.
+    """
+    for (x, y, nx, ny), (removed, promoted) in zip(reversed(path), reversed(undo)):
+        game.revokeMove(x, y, nx, ny, removed, promoted)
+
+
+def perft(game: Pieces, player: int, depth: int, cache: dict = None):
+    """
+    Count the leaf nodes of the move tree.
+
+    :param game: The game board.
+    :param player: The type of the player to move (WHITE, BLACK).
+    :param depth: Number of plies to search.
+    :param cache: Optional dict caching the counts of already searched positions.
+    :return: number of leaf nodes.
+    """
+    if depth == 0:
+        return 1
+
+    if cache is not None:
+        key = (tuple(map(tuple, game.board)), player, depth)
+        if key in cache:
+            return cache[key]
+
+    nodes = 0
+    for path in turns(game, player):
+        undo = play_turn(game, path)
+        nodes += perft(game, 1 - player, depth - 1, cache)
+        revoke_turn(game, path, undo)
+
+    if cache is not None:
+        cache[key] = nodes
+    return nodes
+
+
+_workerCache = None  # Cache shared by the root moves searched in a worker process
+
+
+def _init_worker(useCache: bool):
+    """
+    Set up the cache of a worker process.
+
+    :param useCache: Whether to cache the counts of already searched positions.
+    """
+    global _workerCache
+    _workerCache = {} if useCache else None
+
+
+def _perft_root(args):
+    """
+    Count the leaf nodes below one root move, in a worker process.
+
+    :param args: (board backend, board, player, root move path, depth)
+    :return: number of leaf nodes.
+    """
+    boardClass, board, player, path, depth = args
+    game = boardClass(len(board))
+    game.board = board
+    play_turn(game, path)
+    return perft(game, 1 - player, depth - 1, _workerCache)
+
+
+def divide(game: Pieces, player: int, depth: int, useCache: bool = False, workers: int = 1, boardClass=Pieces):
+    """
+    Count the leaf nodes below each root move.
+
+    :param game: The game board.
+    :param player: The type of the player to move (WHITE, BLACK).
+    :param depth: Number of plies to search, at least 1.
+    :param useCache: Whether to cache the counts of already searched positions.
+        A single process shares one cache across all root moves, each worker process has its own.
+    :param workers: Number of processes the root moves are split across.
+    :param boardClass: Board backend of game, used by the worker processes to rebuild it. Defaults to Pieces.
+    :return: list of (root move path, number of leaf nodes).
+    """
+    if depth < 1:
+        raise ValueError(f'Divide depth must be at least 1: {depth}')
+
+    paths = turns(game, player)
+    if workers > 1:
+        jobs = [(boardClass, game.getBoard(), player, path, depth) for path in paths]
+        with Pool(workers, _init_worker, (useCache,)) as pool:
+            counts = pool.map(_perft_root, jobs)
+    else:
+        cache = {} if useCache else None
+        counts = []
+        for path in paths:
+            undo = play_turn(game, path)
+            counts.append(perft(game, 1 - player, depth - 1, cache))
+            revoke_turn(game, path, undo)
+    return list(zip(paths, counts))
+
+
+def format_path(path):
+    """
+    Format a move as its squares, e.g. (5, 0)-(4, 1) or (5, 2)x(3, 4)x(1, 2).
+    """
+    sep = 'x' if abs(path[0][2] - path[0][0]) == 2 else '-'
+    return sep.join([str(path[0][:2])] + [str(step[2:]) for step in path])
+
+
+def verify(maxNodes: int = 10 ** 6, useCache: bool = False, workers: int = 1, boardClass=Pieces):
+    """
+    Check the move generator against the regression table.
+
+    A board backend must be built with the board size, start from the initial position, and
+    provide board, getBoard, nextMoves, nextPositions, playMove and revokeMove as Pieces does.
+
+    :param maxNodes: Skip the entries with more nodes than this.
+    :param useCache: Whether to cache the counts of already searched positions.
+    :param workers: Number of processes the root moves are split across.
+    :param boardClass: Board backend to check. Defaults to Pieces.
+    :return: True if every count matches, False otherwise.
+    """
+    ok = True
+    for name, (board, player, counts) in REGRESSION.items():
+        for depth, expected in counts.items():
+            if expected > maxNodes:
+                continue
+            game = boardClass(8) if board is None else parse_board(board, boardClass)
+            nodes = sum(count for _, count in divide(game, player, depth, useCache, workers, boardClass))
+            status = 'ok' if nodes == expected else f'FAILED, expected {expected}'
+            print(f'{name} depth {depth}: {nodes} {status}')
+            ok = ok and nodes == expected
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Count and time the leaf nodes of the move tree.')
+    parser.add_argument('depth', type=int, nargs='?', default=6)
+    parser.add_argument('--board', help="custom position, rows separated by '/' using .wWbB")
+    parser.add_argument('--player', choices=PLAYERS, default='black', help='player to move')
+    parser.add_argument('--divide', action='store_true', help='print the node count per root move')
+    parser.add_argument('--cache', action='store_true', help='cache the counts of already searched positions')
+    parser.add_argument('--workers', type=int, default=1, help='processes the root moves are split across')
+    parser.add_argument('--verify', action='store_true', help='check the regression table')
+    parser.add_argument('--max-nodes', type=int, default=10 ** 6, help='largest regression entry to verify')
+    args = parser.parse_args()
+    if args.depth < 0:
+        parser.error(f'depth must be at least 0: {args.depth}')
+
+    if args.verify:
+        raise SystemExit(0 if verify(args.max_nodes, args.cache, args.workers) else 1)
+
+    game = Pieces() if args.board is None else parse_board(args.board)
+    player = PLAYERS[args.player]
+    start = time.perf_counter()
+    if args.depth == 0:
+        nodes = 1
+    else:
+        results = divide(game, player, args.depth, args.cache, args.workers)
+        if args.divide:
+            for path, count in results:
+                print(f'{format_path(path)}: {count}')
+        nodes = sum(count for _, count in results)
+    elapsed = time.perf_counter() - start
+
+    print(f'perft({args.depth}) = {nodes}')
+    if args.depth == 0:
+        # a single root node, the rate would be meaningless
+        print(f'{elapsed:.3f}s')
+    elif args.cache:
+        # cached subtrees are counted without being generated, the rate would not time the move generator
+        print(f'{elapsed:.3f}s, cached')
+    else:
+        print(f'{elapsed:.3f}s, {nodes / max(elapsed, 1e-9):.0f} nodes/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,309 @@
+"""
+Offline tuning of the evaluate_heuristic weights.
+
+Generate labeled positions from engine self-play, then fit the weights with
+Texel-style logistic regression and write them to the weights file loaded by
+Pieces.load_weights at startup.
+
+Usage:
+    python tune.py generate --games 2000 --workers 8
+    python tune.py fit --epochs 20
+"""
+import argparse
+import io
+import json
+import os
+import random
+import re
+from collections import Counter
+from contextlib import redirect_stdout
+from multiprocessing import Pool
+
+import numpy as np
+
+from chess import Pieces
+
+FEATURES = 3  # normals, kings, edgeRow
+ROW_SIZE = FEATURES + 1  # features followed by the result label
+DATA_DIR = 'positions'  # Default directory of the position shards
+SHARD_PATTERN = re.compile(r'shard-(-?\d+)-(-?\d+)-\d+\.bin')  # Shard file name with its seed range
+SCALE = 1000  # Evaluation units giving a 73% expected score, fixes the sigmoid steepness
+DRAW_PLIES = 40  # Plies without capture ending the game in a draw, as the cnt counter of checkers.py
+REPETITIONS = 3  # Occurrences of the same board ending the game in a draw
+
+
+def is_capture(moves):
+    """
+    True if the moves returned by Pieces.nextMoves are capture moves.
+
+    :param moves: Valid moves for a player.
+    :return: True if the moves are captures, False otherwise.
+    """
+    (x, _), targets = moves[0]
+    return abs(targets[0][0] - x) == 2
+
+
+def random_play(game: Pieces, player: int, moves):
+    """
+    Play a random move for the player, continuing to capture if it could.
+
+    :param game: The game board.
+    :param player: The type of the player (WHITE, BLACK).
+    :param moves: Valid moves for the player.
+    :return: whether a piece was captured.
+    """
+    (x, y), targets = random.choice(moves)
+    nx, ny = random.choice(targets)
+    canCapture, removed, _ = game.playMove(x, y, nx, ny)
+
+    while canCapture:
+        _, captures = game.nextPositions(nx, ny)
+        if len(captures) == 0:
+            break
+        x, y = nx, ny
+        nx, ny = random.choice(captures)
+        canCapture, _, _ = game.playMove(x, y, nx, ny)
+
+    return removed != 0
+
+
+def self_play(seed: int, depthLimit: int = 2, randomPlies: int = 8, drawPlies: int = DRAW_PLIES):
+    """
+    Play one engine self-play game and label its quiet positions with the final result.
+
+    :param seed: Seed of the random opening moves.
+    :param depthLimit: The maximum depth of the minimax_calculate algorithm.
+    :param randomPlies: Number of random plies played at the start to diversify the games.
+    :param drawPlies: Number of plies without capture after which the game is a draw.
+    :return: int8 array with one row per position: features of the side to move and its result
+        (0 loss, 1 draw, 2 win). A repeated position, same board and player to move, is recorded once.
+    """
+    random.seed(seed)
+    game = Pieces()
+    player = Pieces.BLACK
+    positions = []  # (player to move, features)
+    seen = Counter()  # occurrences of each position, exact unlike encodeBoard
+    winner = None
+    plies = 0
+    counter = 0  # plies since the last capture
+
+    # minimax_play prints every move, keep the workers quiet
+    with redirect_stdout(io.StringIO()):
+        while counter < drawPlies:
+            moves = game.nextMoves(player)
+            if len(moves) == 0:
+                winner = 1 - player
+                break
+
+            key = (tuple(map(tuple, game.board)), player)
+            seen[key] += 1
+            if seen[key] == REPETITIONS:
+                break
+
+            # Only quiet positions are labeled, captures are forced and resolve tactically
+            if not is_capture(moves) and seen[key] == 1:
+                positions.append((player, game.features(player)))
+
+            if plies < randomPlies:
+                reset = random_play(game, player, moves)
+            else:
+                _, reset = game.minimax_play(player, moves, depthLimit)
+
+            counter = 0 if reset else counter + 1
+            plies += 1
+            player = 1 - player
+
+    rows = np.empty((len(positions), ROW_SIZE), dtype=np.int8)
+    for k, (side, features) in enumerate(positions):
+        rows[k, :FEATURES] = features
+        rows[k, FEATURES] = 1 if winner is None else 2 * (side == winner)
+    return rows
+
+
+def generate_shard(args):
+    """
+    Play a range of self-play games and write their positions to a shard file.
+
+    :param args: (shard file path, list of seeds, depthLimit, randomPlies, drawPlies)
+    :return: number of positions written.
+    """
+    path, seeds, depthLimit, randomPlies, drawPlies = args
+    count = 0
+    with open(path, 'xb') as f:
+        for seed in seeds:
+            rows = self_play(seed, depthLimit, randomPlies, drawPlies)
+            rows.tofile(f)
+            count += len(rows)
+    return count
+
+
+def generate(games: int, workers: int, dataDir: str = DATA_DIR, depthLimit: int = 2,
+             randomPlies: int = 8, drawPlies: int = DRAW_PLIES, seed: int = 0):
+    """
+    Generate labeled positions from self-play games in parallel across cores.
+
+    :param games: Number of self-play games.
+    :param workers: Number of worker processes.
+    :param dataDir: Directory of the position shards.
+    :param depthLimit: The maximum depth of the minimax_calculate algorithm.
+    :param randomPlies: Number of random plies played at the start of each game.
+    :param drawPlies: Number of plies without capture after which a game is a draw.
+    :param seed: First game seed, use a range not generated yet to extend an existing data set.
+    :return: number of positions generated.
+    """
+    os.makedirs(dataDir, exist_ok=True)
+
+    # Shards are named after their seed range, refuse to generate the same games twice
+    for path, start, end in shards(dataDir):
+        if start < seed + games and seed < end:
+            raise SystemExit(f'Seeds {start} to {end - 1} already generated in {path}, use another --seed')
+
+    seeds = list(range(seed, seed + games))
+    jobs = [(os.path.join(dataDir, f'shard-{seed}-{seed + games}-{i:03d}.bin'), seeds[i::workers],
+             depthLimit, randomPlies, drawPlies)
+            for i in range(workers) if seeds[i::workers]]
+    with Pool(workers) as pool:
+        return sum(pool.imap_unordered(generate_shard, jobs))
+
+
+def shards(dataDir: str):
+    """
+    Find the shard files written by generate, other files in the directory are ignored.
+
+    :param dataDir: Directory of the position shards.
+    :return: sorted list of (path, first seed, end seed) of the shards.
+    """
+    found = []
+    for name in sorted(os.listdir(dataDir)) if os.path.isdir(dataDir) else []:
+        match = SHARD_PATTERN.fullmatch(name)
+        if match:
+            found.append((os.path.join(dataDir, name), int(match.group(1)), int(match.group(2))))
+    return found
+
+
+def batches(dataDir: str, batchSize: int):
+    """
+    Stream the positions from the shard files without loading them all in memory.
+    Rows are gathered across shards so that every batch but the last one is full.
+
+    :param dataDir: Directory of the position shards.
+    :param batchSize: Number of positions per batch.
+    :return: generator of (features, labels) float arrays, labels are expected scores in [0, 1].
+    """
+    pending = []  # rows carried over to the next shard
+    size = 0
+    for path, _, _ in shards(dataDir):
+        data = np.memmap(path, dtype=np.int8, mode='r')
+        data = data[:len(data) // ROW_SIZE * ROW_SIZE].reshape(-1, ROW_SIZE)
+        start = 0
+        while start < len(data):
+            chunk = data[start:start + batchSize - size]
+            pending.append(chunk)
+            size += len(chunk)
+            start += len(chunk)
+            if size == batchSize:
+                batch = np.concatenate(pending).astype(np.float64)
+                pending, size = [], 0
+                yield batch[:, :FEATURES], batch[:, FEATURES] / 2
+    if size:
+        batch = np.concatenate(pending).astype(np.float64)
+        yield batch[:, :FEATURES], batch[:, FEATURES] / 2
+
+
+def loss(weights, dataDir: str, batchSize: int):
+    """
+    Mean squared error between the predicted and the actual results over the whole data set.
+
+    :param weights: Evaluation weights (normal, king, edgeRow).
+    :param dataDir: Directory of the position shards.
+    :param batchSize: Number of positions per batch.
+    :return: (loss, number of positions)
+    """
+    total = 0.0
+    count = 0
+    for X, y in batches(dataDir, batchSize):
+        p = 1 / (1 + np.exp(-(X @ weights) / SCALE))
+        total += np.sum((p - y) ** 2)
+        count += len(y)
+    return total / max(count, 1), count
+
+
+def fit(dataDir: str = DATA_DIR, epochs: int = 20, batchSize: int = 65536, learningRate: float = 1.0):
+    """
+    Fit the evaluation weights with Texel-style logistic regression.
+
+    The expected score of a position is sigmoid(evaluation / SCALE), and the weights follow
+    the gradient of its squared error against the game result, one streamed batch at a time.
+    The learning rate applies to the weights measured in SCALE units, so a step moves the
+    weights by learningRate * SCALE times the gradient with respect to weights / SCALE,
+    and does not depend on the choice of SCALE. A smaller last batch takes a proportionally
+    smaller step.
+
+    :param dataDir: Directory of the position shards.
+    :param epochs: Number of passes over the data set.
+    :param batchSize: Number of positions per gradient step.
+    :param learningRate: Step size on the weights in SCALE units.
+    :return: fitted weights (normal, king, edgeRow)
+    """
+    weights = np.array([Pieces.NORMAL_WEIGHT, Pieces.KING_WEIGHT, Pieces.EDGE_ROW_WEIGHT], dtype=np.float64)
+    error, count = loss(weights, dataDir, batchSize)
+    if count == 0:
+        raise SystemExit(f'No positions found in {dataDir}, run "python tune.py generate" first')
+    print(f'{count} positions, initial loss {error:.6f}')
+
+    for epoch in range(epochs):
+        for X, y in batches(dataDir, batchSize):
+            p = 1 / (1 + np.exp(-(X @ weights) / SCALE))
+            # d/du mean((p - y)^2) with u = weights / SCALE and dp/du = p (1 - p) X
+            gradient = X.T @ ((p - y) * p * (1 - p)) * 2 / len(y)
+            weights -= learningRate * SCALE * gradient * len(y) / batchSize
+        error, _ = loss(weights, dataDir, batchSize)
+        print(f'epoch {epoch + 1}: loss {error:.6f}, weights {np.round(weights).astype(int).tolist()}')
+
+    return weights
+
+
+def save_weights(weights, path: str = Pieces.WEIGHTS_FILE):
+    """
+    Write the weights file loaded by Pieces.load_weights.
+
+    :param weights: Evaluation weights (normal, king, edgeRow).
+    :param path: Path of the weights file.
+    """
+    normal, king, edgeRow = (int(round(w)) for w in weights)
+    with open(path, 'w') as f:
+        json.dump({'normal': normal, 'king': king, 'edgeRow': edgeRow}, f, indent=4)
+    print(f'Weights written to {path}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tune the evaluate_heuristic weights from self-play games.')
+    parser.add_argument('--data', default=DATA_DIR, help='directory of the position shards')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    generateParser = commands.add_parser('generate', help='generate labeled positions from self-play')
+    generateParser.add_argument('--games', type=int, default=1000)
+    generateParser.add_argument('--workers', type=int, default=os.cpu_count())
+    generateParser.add_argument('--depth', type=int, default=2, help='minimax depth of the self-play engine')
+    generateParser.add_argument('--random-plies', type=int, default=8)
+    generateParser.add_argument('--draw-plies', type=int, default=DRAW_PLIES)
+    generateParser.add_argument('--seed', type=int, default=0)
+
+    fitParser = commands.add_parser('fit', help='fit the weights and write the weights file')
+    fitParser.add_argument('--epochs', type=int, default=20)
+    fitParser.add_argument('--batch-size', type=int, default=65536)
+    fitParser.add_argument('--learning-rate', type=float, default=1.0)
+    fitParser.add_argument('--output', default=Pieces.WEIGHTS_FILE)
+
+    args = parser.parse_args()
+    if args.command == 'generate':
+        count = generate(args.games, args.workers, args.data, args.depth, args.random_plies,
+                         args.draw_plies, args.seed)
+        print(f'{count} positions written to {args.data}')
+    else:
+        weights = fit(args.data, args.epochs, args.batch_size, args.learning_rate)
+        save_weights(weights, args.output)
+
+
+if __name__ == '__main__':
+    main()